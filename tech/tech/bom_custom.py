@@ -1,170 +1,487 @@
+import hashlib
+
 import frappe
 from frappe import _
-from frappe.utils import now
+from frappe.utils import cint, cstr, flt, get_datetime, now
+
+# Columns set on every inserted child row, followed by the copied fields below
+_CHILD_COLS = (
+    "name", "creation", "modified", "owner", "modified_by", "parenttype", "parentfield",
+    "parent", "docstatus"
+)
+
+# Child table columns copied from the template BOM, in insert order.
+# The first four BOM Item fields are resolved per variant BOM, the rest are copied as is.
+_BOM_ITEM_FIELDS = (
+    "item_code", "item_name", "qty", "rate",
+    "do_not_explode", "bom_no", "allow_alternative_item", "is_stock_item", "uom", "stock_qty",
+    "stock_uom", "conversion_factor", "include_item_in_manufacturing", "amount", "sourced_by_supplier", "idx"
+)
+_BOM_OPERATION_FIELDS = (
+    "operation", "description", "workstation", "time_in_mins", "fixed_time", "sequence_id", "idx"
+)
+
+# Variant BOMs written per transaction; a sync job writes its chunks one after another
+_VARIANT_BOMS_PER_CHUNK = 50
+
+# Redis hash of template item -> signature of its last variant BOM sync that completed
+_SIGNATURE_CACHE_KEY = "bom_variant_sync_signature"
+
+# Per template item: lock holding the token of the running sync, and the template BOM of a sync
+# requested meanwhile, which the running sync queues when it finishes
+_SYNC_LOCK_KEY = "bom_variant_sync_lock:{}"
+_RESYNC_KEY = "bom_variant_sync_resync:{}"
+
+# Seconds a sync job may run; its lock expires with it
+_SYNC_TIMEOUT = 60 * 60
+
+# Deletes the lock only if it still holds the given token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _bulk_insert_children(doctype, parentfield, fields, rows):
+    """
+    Inserts child rows of BOMs with frappe.db.bulk_insert, one flat (parent, docstatus, *fields) tuple per row.
+    Skips the document lifecycle; rows are copied from an already validated template BOM.
+    """
+    if not rows:
+        return
+
+    timestamp = now()
+    user = frappe.session.user
+    frappe.db.bulk_insert(
+        doctype,
+        _CHILD_COLS + fields,
+        (
+            (frappe.generate_hash(length=10), timestamp, timestamp, user, user, "BOM", parentfield) + row
+            for row in rows
+        ),
+        chunk_size=1000
+    )
+
 
 def bom_custom(doc, method):
     """
-    Syncs template BOM changes to all its variant BOMs on before_save.
+    Syncs template BOM changes to all its variant BOMs on submit.
     - Replaces BOM items with size-matching variant items if available.
     - Preserves qty and rate from existing variant BOM items.
-    - Copies operations from template BOM to variant BOMs using SQL deletion and insertion.
+    - Copies items and operations from template BOM to variant BOMs using SQL deletion and bulk insertion.
     - Syncs routing field from template BOM.
     - Throws error and prevents submission if no matching-size variant exists for any item.
+    The checks run here; the variant BOMs are rewritten by a background job.
+
+    Skipped during install, migrate and patches, and when doc.flags.ignore_variant_sync is set.
+    Batch importers can set that flag on every BOM they save and call sync_variant_boms(bom_name) once at the end.
+    """
+    if doc.flags.get("ignore_variant_sync") or frappe.flags.in_install or frappe.flags.in_migrate or frappe.flags.in_patch:
+        return
+
+    _queue_sync(doc)
+
+
+def sync_variant_boms(bom_name):
+    """
+    Runs the same checks as bom_custom for a saved template BOM and queues the sync of its variant BOMs.
+    Meant for batch importers that skipped the per-save sync with doc.flags.ignore_variant_sync.
+    The job is enqueued when the caller's transaction commits.
+    """
+    _queue_sync(frappe.get_doc("BOM", bom_name))
+
+
+def _queue_sync(doc):
+    """
+    Checks the variants of a template BOM, throwing if any are missing, and queues _do_sync unless nothing changed.
     """
-    if not frappe.db.get_value("Item", doc.item, "has_variants"):
+    item_meta = _get_item_meta([doc.item] + [tpl_item.item_code for tpl_item in doc.items])
+    if not item_meta.get(doc.item, {}).get("has_variants"):
         return  # Not a template item
 
-    variant_items = frappe.get_all("Item", filters={"variant_of": doc.item, "disabled": 0}, fields=["name"])
-    if not variant_items:
+    plan = _get_sync_plan(doc)
+    if not plan.variant_items:
         frappe.throw(
             "No variant items found for template item {}. Cannot submit template BOM without variants.".format(doc.item),
             title="No Variants Found"
         )
 
-    errors = []
-    missing_variant_errors = []
+    for variant_code in plan.variants_without_size:
+        frappe.msgprint("Variant item {} has no Size attribute. Skipping.".format(variant_code))
+
+    if plan.missing_variant_errors:
+        frappe.throw(
+            "\n".join(plan.missing_variant_errors),
+            title="Missing Variant Items"
+        )
+
+    # Nothing to do if the last completed sync for this item had the same template and variant BOMs
+    if frappe.cache.hget(_SIGNATURE_CACHE_KEY, doc.item) == _get_sync_signature(doc, plan):
+        frappe.msgprint("Variant BOMs are already up to date.")
+        return
+
+    frappe.logger("bom_custom").debug("Queueing variant BOM sync for BOM {} (item {})".format(doc.name, doc.item))
+    frappe.enqueue(
+        "tech.tech.bom_custom._do_sync",
+        queue="long",
+        timeout=_SYNC_TIMEOUT,
+        job_name="bom_sync:{}".format(doc.name),
+        enqueue_after_commit=True,
+        doc_name=doc.name
+    )
+    frappe.msgprint("Variant BOM sync has been queued.")
 
-    for variant in variant_items:
-        variant_code = variant.name
-        parent_item = frappe.get_doc("Item", variant_code)
 
-        # Get parent variant's Size attribute
-        parent_size = next(
-            (attr.attribute_value for attr in parent_item.get("attributes") if attr.attribute == "Size"),
-            None
+def _get_sync_signature(doc, plan, modified=None):
+    """
+    Returns a hash of everything the sync copies from the template BOM, the size-matching variants
+    it resolves and the variant BOMs it writes to, including when each was last modified.
+    Pass modified to get the signature the variant BOMs will have once a sync has stamped them with it.
+    """
+    signature = (
+        [_get_typed_values(tpl_item, _BOM_ITEM_FIELDS) for tpl_item in doc.items],
+        [_get_typed_values(op, _BOM_OPERATION_FIELDS) for op in doc.operations],
+        _get_typed_values(doc, ("routing",)),
+        sorted(plan.size_map.items()),
+        sorted(
+            (bom.name, str(get_datetime(modified or bom.modified)))
+            for boms in plan.boms_by_item.values() for bom in boms
         )
+    )
+    return hashlib.blake2b(repr(signature).encode(), digest_size=16).hexdigest()
+
+
+def _get_typed_values(row, fields):
+    """
+    Returns the given fields of a document or child row cast by fieldtype.
+    Values posted from the desk are not cast (1 vs 1.0, '' vs None), so this keeps the signature
+    of a submitted doc equal to that of the same doc reloaded from the database.
+    """
+    meta = frappe.get_meta(row.doctype)
+    values = []
+    for field in fields:
+        df = meta.get_field(field)
+        fieldtype = df.fieldtype if df else ("Int" if field == "idx" else "Data")
+        value = row.get(field)
+        if fieldtype in ("Float", "Currency", "Percent"):
+            values.append(flt(value))
+        elif fieldtype in ("Int", "Check"):
+            values.append(cint(value))
+        else:
+            values.append(cstr(value))
+
+    return tuple(values)
+
+
+def _get_item_meta(item_codes):
+    """
+    Returns has_variants and item_name of the given items, keyed by item code.
+    Fetched in one query and memoised in frappe.local.flags for the rest of the request or job.
+    """
+    cache = frappe.local.flags.setdefault("_bom_item_meta", {})
+    missing = list({code for code in item_codes if code and code not in cache})
+    if missing:
+        for r in frappe.get_all("Item", filters={"name": ["in", missing]}, fields=["name", "has_variants", "item_name"]):
+            cache[r.name] = r
+
+    return {code: cache[code] for code in item_codes if code in cache}
+
+
+def _get_sync_plan(doc):
+    """
+    Looks up the variant items, their sizes, size-matching variants and active BOMs for a template BOM.
+    """
+    plan = frappe._dict(
+        variant_items=[],
+        variants_without_size=[],
+        parent_size_map={},
+        size_map={},
+        tpl_variant_codes=set(),
+        item_name_map={},
+        boms_by_item={},
+        missing_variant_errors=[]
+    )
+
+    plan.variant_items = frappe.get_all("Item", filters={"variant_of": doc.item, "disabled": 0}, fields=["name"])
+    if not plan.variant_items:
+        return plan
+
+    # Resolve the Size attribute of every variant item in one query
+    variant_sizes = {}
+    for r in frappe.get_all("Item Variant Attribute",
+        filters={"parent": ["in", [v.name for v in plan.variant_items]], "attribute": "Size"},
+        fields=["parent", "attribute_value"]
+    ):
+        variant_sizes.setdefault(r.parent, r.attribute_value)
+
+    for variant in plan.variant_items:
+        parent_size = variant_sizes.get(variant.name)
         if not parent_size:
-            frappe.msgprint("Variant item {} has no Size attribute. Skipping.".format(variant_code))
+            plan.variants_without_size.append(variant.name)
             continue
 
-        # Get active BOMs for this variant
-        variant_boms = frappe.get_all("BOM", filters={
-            "item": variant_code,
+        plan.parent_size_map[variant.name] = parent_size
+
+    # Map (template item, size) to its size-matching variant in one query
+    item_meta = _get_item_meta([tpl_item.item_code for tpl_item in doc.items])
+    plan.tpl_variant_codes = {code for code, meta in item_meta.items() if meta.has_variants}
+    sizes = list(set(plan.parent_size_map.values()))
+    if plan.tpl_variant_codes and sizes:
+        for r in frappe.get_all("Item Variant Attribute",
+            filters={
+                "variant_of": ["in", list(plan.tpl_variant_codes)],
+                "attribute": "Size",
+                "attribute_value": ["in", sizes]
+            },
+            fields=["parent", "variant_of", "attribute_value"]
+        ):
+            plan.size_map.setdefault((r.variant_of, r.attribute_value), r.parent)
+
+    # Item names of the template items and their matched variants, fetched through the same memoised lookup
+    item_meta.update(_get_item_meta(list(set(plan.size_map.values()))))
+    plan.item_name_map = {code: meta.item_name for code, meta in item_meta.items()}
+
+    # Get active BOMs for all variants in one query
+    if plan.parent_size_map:
+        for bom in frappe.get_all("BOM", filters={
+            "item": ["in", list(plan.parent_size_map)],
             "is_active": 1,
             "docstatus": ["!=", 2]
-        }, fields=["name", "docstatus"])
-
-        for bom in variant_boms:
-            try:
-                variant_bom_name = bom.name
-                variant_docstatus = bom.docstatus
-
-                # Fetch existing items to preserve qty and rate
-                qty_rate_map = {}
-                existing_items = frappe.get_all("BOM Item",
-                    filters={"parent": variant_bom_name},
-                    fields=["item_code", "qty", "rate"]
-                )
-                for itm in existing_items:
-                    qty_rate_map[itm.item_code] = {
-                        "qty": itm.qty,
-                        "rate": itm.rate
-                    }
-
-                # Clear existing items and operations from the variant BOM
-                frappe.db.sql("DELETE FROM `tabBOM Item` WHERE parent = %s", variant_bom_name)
-                frappe.db.sql("DELETE FROM `tabBOM Operation` WHERE parent = %s", variant_bom_name)
-
-                # Copy items from template BOM to variant BOM
-                for tpl_item in doc.items:
-                    new_code = tpl_item.item_code
-
-                    # Replace with variant if item has variants and size match is found
-                    if tpl_item.has_variants:
-                        matched_variant = frappe.db.get_value(
-                            "Item Variant Attribute",
-                            {
-                                "variant_of": tpl_item.item_code,
-                                "attribute": "Size",
-                                "attribute_value": parent_size
-                            },
-                            "parent"
+        }, fields=["name", "item", "docstatus", "modified"]):
+            plan.boms_by_item.setdefault(bom.item, []).append(bom)
+
+    for variant_code, parent_size in plan.parent_size_map.items():
+        for bom in plan.boms_by_item.get(variant_code, []):
+            for tpl_item in doc.items:
+                if tpl_item.item_code in plan.tpl_variant_codes and (tpl_item.item_code, parent_size) not in plan.size_map:
+                    plan.missing_variant_errors.append(
+                        "No size-matching variant for {} in BOM {}. Cannot submit template BOM.".format(
+                            tpl_item.item_code, bom.name
                         )
-                        if matched_variant:
-                            new_code = matched_variant
-                        else:
-                            error_msg = "No size-matching variant for {} in BOM {}. Cannot submit template BOM.".format(
-                                tpl_item.item_code, variant_bom_name
-                            )
-                            missing_variant_errors.append(error_msg)
-                            continue
-
-                    item_data = {
-                        "doctype": "BOM Item",
-                        "parent": variant_bom_name,
-                        "parenttype": "BOM",
-                        "parentfield": "items",
-                        "item_code": new_code,
-                        "item_name": frappe.db.get_value("Item", new_code, "item_name") or tpl_item.item_name,
-                        "do_not_explode": tpl_item.do_not_explode,
-                        "bom_no": tpl_item.bom_no,
-                        "allow_alternative_item": tpl_item.allow_alternative_item,
-                        "is_stock_item": tpl_item.is_stock_item,
-                        "qty": qty_rate_map.get(new_code, {}).get("qty", tpl_item.qty),
-                        "uom": tpl_item.uom,
-                        "stock_qty": tpl_item.stock_qty,
-                        "stock_uom": tpl_item.stock_uom,
-                        "conversion_factor": tpl_item.conversion_factor,
-                        "rate": qty_rate_map.get(new_code, {}).get("rate", tpl_item.rate),
-                        # "has_variants": tpl_item.has_variants,
-                        "include_item_in_manufacturing": tpl_item.include_item_in_manufacturing,
-                        "amount": tpl_item.amount,
-                        "sourced_by_supplier": tpl_item.sourced_by_supplier,
-                        "idx": tpl_item.idx
-                    }
-                    frappe.get_doc(item_data).insert(
-                        ignore_permissions=True,
-                        ignore_links=True,
-                        ignore_if_duplicate=True,
-                        ignore_mandatory=True
                     )
 
-                # Copy operations from template BOM to variant BOM
-                for op in doc.operations:
-                    op_data = {
-                        "doctype": "BOM Operation",
-                        "parent": variant_bom_name,
-                        "parenttype": "BOM",
-                        "parentfield": "operations",
-                        "operation": op.operation,
-                        "description": op.description,
-                        "workstation": op.workstation,
-                        "time_in_mins": op.time_in_mins,
-                        "fixed_time": op.fixed_time,
-                        "sequence_id": op.sequence_id,
-                        "idx": op.idx
-                    }
-                    frappe.get_doc(op_data).insert(
-                        ignore_permissions=True,
-                        ignore_links=True,
-                        ignore_if_duplicate=True,
-                        ignore_mandatory=True
-                    )
+    return plan
+
 
-                # Sync routing field from template BOM
-                frappe.db.set_value("BOM", variant_bom_name, "routing", doc.routing)
+def _get_sync_key(key, template_item):
+    return frappe.cache.make_key(key.format(template_item))
 
-                # Update modified timestamp for submitted BOMs
-                if variant_docstatus == 1:
-                    frappe.db.set_value("BOM", variant_bom_name, "modified", now())
 
-                frappe.db.commit()
+def _acquire_sync_lock(template_item, doc_name, token):
+    """
+    Takes the sync lock of the template item. If another sync holds it, leaves doc_name for that sync
+    to queue when it finishes and returns False, so no worker waits on the lock.
+    """
+    lock_key = _get_sync_key(_SYNC_LOCK_KEY, template_item)
+    if frappe.cache.set(lock_key, token, nx=True, ex=_SYNC_TIMEOUT):
+        return True
 
-            except Exception as e:
-                frappe.log_error("Error syncing variant BOM {}: {}".format(bom.name, str(e)), "BOM Sync")
-                errors.append("Failed to update Variant BOM {}: {}".format(bom.name, str(e)))
+    frappe.cache.set(_get_sync_key(_RESYNC_KEY, template_item), doc_name, ex=_SYNC_TIMEOUT)
 
-    # Throw error for missing variants after processing all BOMs
-    if missing_variant_errors:
-        frappe.throw(
-            "\n".join(missing_variant_errors),
-            title="Missing Variant Items"
+    # The running sync may have finished before the marker was set
+    return bool(frappe.cache.set(lock_key, token, nx=True, ex=_SYNC_TIMEOUT))
+
+
+def _release_sync_lock(template_item, doc_name, token):
+    """
+    Releases the sync lock if this sync still owns it, then queues any sync requested meanwhile.
+    """
+    frappe.cache.eval(_RELEASE_LOCK_SCRIPT, 1, _get_sync_key(_SYNC_LOCK_KEY, template_item), token)
+
+    resync_key = _get_sync_key(_RESYNC_KEY, template_item)
+    pipe = frappe.cache.pipeline()
+    pipe.get(resync_key)
+    pipe.delete(resync_key)
+    resync_bom = pipe.execute()[0]
+    if resync_bom and resync_bom.decode() != doc_name:
+        frappe.enqueue(
+            "tech.tech.bom_custom._do_sync",
+            queue="long",
+            timeout=_SYNC_TIMEOUT,
+            job_name="bom_sync:{}".format(resync_bom.decode()),
+            doc_name=resync_bom.decode()
         )
 
-    if errors:
-        frappe.msgprint("\n".join(errors), title="Errors in Syncing Variant BOMs")
+
+def _do_sync(doc_name):
+    """
+    Background job: rewrites the items, operations and routing of every active variant BOM of a template BOM.
+    Variant BOMs are written in chunks, one after another, each in its own transaction.
+    Syncs of the same template item are serialised by a Redis lock; one requested while another runs
+    is queued by the running sync when it finishes.
+    """
+    doc = frappe.get_doc("BOM", doc_name)
+    token = frappe.generate_hash(length=10)
+    if not _acquire_sync_lock(doc.item, doc.name, token):
+        frappe.logger("bom_custom").debug("Variant BOM sync for item {} is running, BOM {} will follow it".format(
+            doc.item, doc.name))
+        return
+
+    try:
+        plan = _get_sync_plan(doc)
+        frappe.logger("bom_custom").debug("Syncing variant BOMs for BOM {} (item {})".format(doc.name, doc.item))
+
+        # Snapshot the template rows once instead of reading them through the document for every variant BOM
+        item_tpl = [
+            (
+                tpl_item.item_code,
+                tpl_item.item_code in plan.tpl_variant_codes,
+                tpl_item.item_name,
+                tpl_item.qty,
+                tpl_item.rate,
+                tuple(tpl_item.get(field) for field in _BOM_ITEM_FIELDS[4:])
+            )
+            for tpl_item in doc.items
+        ]
+        op_tpl = [tuple(op.get(field) for field in _BOM_OPERATION_FIELDS) for op in doc.operations]
+
+        variant_boms = [
+            (bom.name, bom.docstatus, parent_size)
+            for variant_code, parent_size in plan.parent_size_map.items()
+            for bom in plan.boms_by_item.get(variant_code, [])
+        ]
+
+        # Every variant BOM is stamped with the same modified timestamp, so the signature after the sync is known now
+        modified = now()
+        failed_bom_names = []
+        for i in range(0, len(variant_boms), _VARIANT_BOMS_PER_CHUNK):
+            failed_bom_names.extend(_sync_variant_boms(
+                template_bom=doc.name,
+                routing=doc.routing,
+                modified=modified,
+                variant_boms=variant_boms[i:i + _VARIANT_BOMS_PER_CHUNK],
+                item_tpl=item_tpl,
+                op_tpl=op_tpl,
+                size_map=plan.size_map,
+                item_name_map=plan.item_name_map
+            ))
+
+    except Exception:
+        frappe.cache.hdel(_SIGNATURE_CACHE_KEY, doc.item)
+        raise
+
+    finally:
+        _release_sync_lock(doc.item, doc.name, token)
+
+    if failed_bom_names:
+        frappe.cache.hdel(_SIGNATURE_CACHE_KEY, doc.item)
+        frappe.publish_realtime("msgprint", "Failed to update Variant BOMs of {}: {}".format(
+            doc.name, ", ".join(failed_bom_names)), user=frappe.session.user)
     else:
-        frappe.msgprint("All variant BOMs updated successfully.")
+        frappe.cache.hset(_SIGNATURE_CACHE_KEY, doc.item, _get_sync_signature(doc, plan, modified))
+        frappe.publish_realtime("msgprint", "{} variant BOMs of {} updated successfully.".format(
+            len(variant_boms), doc.name), user=frappe.session.user)
+
+
+def _sync_variant_boms(template_bom, routing, modified, variant_boms, item_tpl, op_tpl, size_map, item_name_map):
+    """
+    Rewrites a chunk of variant BOMs, a list of (name, docstatus, size), from a template snapshot.
+    The chunk is written with one statement per table; if that fails, each variant BOM is retried on its own
+    under a savepoint, so one failing BOM does not hold back the rest.
+    Returns the names of the variant BOMs that could not be updated.
+    """
+    variant_bom_names = [name for name, _docstatus, _size in variant_boms]
+    try:
+        # Lock the variant BOM rows against direct edits while they are rewritten
+        frappe.db.sql("SELECT name FROM `tabBOM` WHERE name IN %(names)s FOR UPDATE",
+            {"names": tuple(variant_bom_names)})
+
+        # Fetch existing items of the variant BOMs to preserve qty and rate
+        qty_rate = {}
+        for itm in frappe.get_all("BOM Item",
+            filters={"parent": ["in", variant_bom_names]},
+            fields=["parent", "item_code", "qty", "rate"]
+        ):
+            qty_rate[(itm.parent, itm.item_code)] = (itm.qty, itm.rate)
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error("Error syncing variant BOMs {} of {}: {}".format(
+            ", ".join(variant_bom_names), template_bom, str(e)), "BOM Sync")
+        frappe.db.commit()  # Keep the Error Log row
+        return variant_bom_names
+
+    # Build the rows of every variant BOM first, so the writes below are one statement per table
+    item_rows = {}
+    op_rows = {}
+    for variant_bom_name, variant_docstatus, parent_size in variant_boms:
+        # Copy items from template BOM to variant BOM
+        bom_item_rows = item_rows[variant_bom_name] = []
+        for item_code, is_template, item_name, tpl_qty, tpl_rate, copied in item_tpl:
+            new_code = item_code
+
+            # Replace with variant if item has variants and size match is found
+            if is_template:
+                new_code = size_map.get((item_code, parent_size))
+                if not new_code:
+                    continue  # Checked on submit; the variant was removed since
+
+            # Preserve existing qty and rate of the variant BOM
+            qty, rate = qty_rate.get((variant_bom_name, new_code), (tpl_qty, tpl_rate))
 
+            bom_item_rows.append(
+                (variant_bom_name, variant_docstatus, new_code, item_name_map.get(new_code) or item_name, qty, rate)
+                + copied
+            )
+
+        # Copy operations from template BOM to variant BOM
+        op_rows[variant_bom_name] = [(variant_bom_name, variant_docstatus) + op for op in op_tpl]
+
+    try:
+        _write_variant_boms(
+            variant_bom_names,
+            [row for name in variant_bom_names for row in item_rows[name]],
+            [row for name in variant_bom_names for row in op_rows[name]],
+            routing,
+            modified
+        )
+        frappe.db.commit()
+        return []
+
+    except Exception:
+        frappe.db.rollback()
+
+    # Fall back to one variant BOM at a time
+    failed_bom_names = []
+    for variant_bom_name in variant_bom_names:
+        frappe.db.savepoint("variant_bom_sync")
+        try:
+            frappe.db.sql("SELECT name FROM `tabBOM` WHERE name = %s FOR UPDATE", variant_bom_name)
+            _write_variant_boms([variant_bom_name], item_rows[variant_bom_name], op_rows[variant_bom_name],
+                routing, modified)
+            frappe.db.release_savepoint("variant_bom_sync")
+
+        except Exception as e:
+            frappe.db.rollback(save_point="variant_bom_sync")
+            frappe.log_error("Error syncing variant BOM {}: {}".format(variant_bom_name, str(e)), "BOM Sync")
+            failed_bom_names.append(variant_bom_name)
+
+    frappe.db.commit()
+    return failed_bom_names
+
+
+def _write_variant_boms(variant_bom_names, item_rows, op_rows, routing, modified):
+    """
+    Replaces the child rows of the given variant BOMs and syncs their routing, one statement per table.
+    """
+    frappe.db.sql("DELETE FROM `tabBOM Item` WHERE parent IN %(names)s",
+        {"names": tuple(variant_bom_names)})
+    frappe.db.sql("DELETE FROM `tabBOM Operation` WHERE parent IN %(names)s",
+        {"names": tuple(variant_bom_names)})
 
+    _bulk_insert_children("BOM Item", "items", _BOM_ITEM_FIELDS, item_rows)
+    _bulk_insert_children("BOM Operation", "operations", _BOM_OPERATION_FIELDS, op_rows)
 
+    # Sync routing field from template BOM and update modified timestamp in one statement
+    frappe.db.sql("""
+        UPDATE `tabBOM`
+        SET routing = %(routing)s, modified = %(modified)s, modified_by = %(user)s
+        WHERE name IN %(names)s
+    """, {
+        "routing": routing,
+        "modified": modified,
+        "user": frappe.session.user,
+        "names": tuple(variant_bom_names)
+    })